@@ -1,21 +1,74 @@
 # PyClipper_Beta.py - MoviePy v2.x+ Quick Cut Editor with Enhanced Audio Options
 
 from moviepy.video.io.VideoFileClip import VideoFileClip
+from moviepy.video.io import ffmpeg_writer
 from moviepy.audio.io.AudioFileClip import AudioFileClip
-from moviepy.audio.AudioClip import CompositeAudioClip, AudioArrayClip, concatenate_audioclips
+from moviepy.audio.AudioClip import AudioClip, CompositeAudioClip, concatenate_audioclips
 from moviepy.video.VideoClip import ImageClip
 from moviepy.video.compositing.CompositeVideoClip import CompositeVideoClip
 from moviepy import concatenate_videoclips
-from moviepy.audio.fx import AudioFadeIn, AudioFadeOut, AudioLoop
+from moviepy.audio.fx import AudioLoop
 from moviepy.video.fx import FadeIn, FadeOut
 from moviepy import TextClip, vfx
 import os
+import re
+import argparse
 import csv
+import atexit
+import functools
+import hashlib
 import numpy as np
 import json
 from pathlib import Path
 import subprocess
 import tempfile
+import shutil
+from concurrent.futures import ThreadPoolExecutor
+
+try:
+    import orjson
+    _json_loads = orjson.loads
+except ImportError:
+    orjson = None
+    _json_loads = json.loads
+
+# ==============================
+# COMMAND LINE SECTION
+# ==============================
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="MoviePy quick cut editor")
+    parser.add_argument(
+        "--spec",
+        help="JSON file with 'graphics', 'captions' and 'caption_style' entries, used instead of the overlay prompts"
+    )
+    # Render settings; any left out are asked for interactively
+    parser.add_argument("--audio-mode", choices=["1", "2", "3", "4"], help="Audio mix option, as numbered in the prompt")
+    parser.add_argument("--new-audio", help="Path to the additional audio track")
+    parser.add_argument("--fades", type=parse_fades_arg, help="Soundtrack fades as type:start:duration, e.g. in:0:2,out:1:30:5")
+    parser.add_argument("--quality", choices=["good", "better", "ultra"], help="Render quality")
+    parser.add_argument("--gpu", choices=["nvidia", "amd", "intel", "none"], help="Hardware encoder, or 'none' for CPU")
+    return parser.parse_args()
+
+def parse_fades_arg(value):
+    """Parses 'in:10:2,out:1:30:5' into (type, start, duration) strings; times are resolved later"""
+    fades = []
+    for item in value.split(","):
+        fade_type, _, rest = item.strip().partition(":")
+        start, sep, duration = rest.rpartition(":")
+        if fade_type not in ("in", "out") or not sep or not start:
+            raise argparse.ArgumentTypeError(f"Invalid fade '{item}', expected type:start:duration")
+        fades.append((fade_type, start, duration))
+    return fades
+
+def load_spec(spec_path):
+    """Loads the overlay spec file; returns an empty spec if none was given"""
+    if not spec_path:
+        return {}
+    return _json_loads(Path(spec_path).read_bytes())
+
+ARGS = parse_args()
+SPEC = load_spec(ARGS.spec)
 
 # ==============================
 # CONFIG FILE HANDLING SECTION
@@ -33,33 +86,66 @@ def choose_config_location():
 
 CONFIG_PATH = choose_config_location()
 
+_cached_config = None
+_cached_mtime = None
+_pending_config = None
+_pending_path = None
+_config_dirty = False
+
+def _dump_config(config):
+    if orjson is not None:
+        return orjson.dumps(config, option=orjson.OPT_INDENT_2)
+    return json.dumps(config, indent=2).encode()
+
 def load_config():
+    global _cached_config, _cached_mtime
     default_config = {"video": "", "audio": "", "graphic": "", "font": "", "gpu_type": ""}
     try:
-        if CONFIG_PATH.exists():
-            with open(CONFIG_PATH, "r") as f:
-                config = json.load(f)
-            print("Loaded existing config:")
-            print(json.dumps(config, indent=2))
-            return config
-        else:
-            print("Config file does not exist. Using defaults.")
-            return default_config
+        mtime = CONFIG_PATH.stat().st_mtime
+    except FileNotFoundError:
+        print("Config file does not exist. Using defaults.")
+        return default_config
+    try:
+        if _cached_config is not None and mtime == _cached_mtime:
+            return _cached_config
+        config = _json_loads(CONFIG_PATH.read_bytes())
+        _cached_config, _cached_mtime = config, mtime
+        print("Loaded existing config:")
+        print(json.dumps(config, indent=2))
+        return config
     except Exception as e:
         print(f"Error loading config: {e}")
         return default_config
 
-def save_config(config, config_path=None):
-    if config_path is None:
-        config_path = CONFIG_PATH
+def save_config(config, config_path=None, flush=False):
+    """Marks the config as changed; it is written once by flush_config()."""
+    global _pending_config, _pending_path, _config_dirty
+    _pending_config = config
+    _pending_path = config_path if config_path is not None else CONFIG_PATH
+    _config_dirty = True
+    if flush:
+        flush_config()
+
+def flush_config():
+    """Writes pending config changes to disk in a single pass."""
+    global _config_dirty, _cached_config, _cached_mtime
+    if not _config_dirty:
+        return
     try:
-        with open(str(config_path), "w") as f:
-            json.dump(config, f, indent=2)
+        data = _dump_config(_pending_config)
+        Path(_pending_path).write_bytes(data)
+        _config_dirty = False
+        if Path(_pending_path) == CONFIG_PATH:
+            _cached_config, _cached_mtime = _pending_config, CONFIG_PATH.stat().st_mtime
         print("Saved updated config:")
-        print(json.dumps(config, indent=2))
+        print(data.decode())
     except Exception as e:
         print(f"Error saving config: {e}")
 
+atexit.register(flush_config)
+
+_PATH_TRANS = str.maketrans({"\\": "/"})
+
 def get_input(prompt, config_key, config):
     saved_value = config.get(config_key, "").strip()
     if saved_value:
@@ -67,10 +153,10 @@ def get_input(prompt, config_key, config):
         if reuse == "y":
             print(f"Using saved {config_key}: {saved_value}")
             return saved_value
-    new_value = input(prompt).strip('"')
-    new_value = new_value.replace("\\", "/")
-    config[config_key] = new_value
-    save_config(config)
+    new_value = input(prompt).strip().strip('"').translate(_PATH_TRANS)
+    if config.get(config_key) != new_value:
+        config[config_key] = new_value
+        save_config(config)
     return new_value
 
 config = load_config()
@@ -79,76 +165,153 @@ config = load_config()
 # AUDIO PRE-PROCESSING SECTION
 # =========================
 
+AUDIO_CACHE_DIR = Path.home() / ".pyclipper_cache"
+AUDIO_CACHE_MAX_BYTES = 2 << 30  # Oldest WAVs are evicted past 2 GiB
+
+def ffmpeg_error(e):
+    """Returns ffmpeg's stderr for a failed run, or the OS error if ffmpeg never started"""
+    stderr = getattr(e, "stderr", None)
+    return stderr.decode(errors="replace") if stderr else str(e)
+
+def _audio_cache_key(path):
+    """Hashes the first MiB and the size of a file to name its cached conversion"""
+    h = hashlib.blake2b(digest_size=8)
+    with open(path, "rb") as f:
+        h.update(f.read(1 << 20))
+    h.update(str(os.path.getsize(path)).encode())
+    return h.hexdigest()
+
+def prune_audio_cache(keep, max_bytes=AUDIO_CACHE_MAX_BYTES):
+    """Deletes the least recently used cached WAVs, never keep, until the cache fits in max_bytes"""
+    entries = []
+    for entry in AUDIO_CACHE_DIR.glob("*.wav"):
+        # Skip the entry in use and other runs' conversions still being written
+        if entry == keep or entry.name.startswith(tempfile.gettempprefix()):
+            continue
+        try:
+            st = entry.stat()
+        except OSError:
+            continue
+        entries.append((st.st_mtime, st.st_size, entry))
+    try:
+        total = keep.stat().st_size
+    except OSError:
+        total = 0
+    total += sum(size for _, size, _ in entries)
+    for _, size, entry in sorted(entries, key=lambda e: e[0]):
+        if total <= max_bytes:
+            break
+        try:
+            entry.unlink()
+        except OSError:
+            continue
+        total -= size
+
 def convert_mp3_to_wav(mp3_path):
-    """Converts MP3 to WAV using ffmpeg, returns path to temporary WAV file"""
-    if not mp3_path.lower().endswith(".mp3"):
+    """Converts MP3 to WAV using ffmpeg, returns path to the cached WAV file"""
+    if os.path.splitext(mp3_path)[1].lower() != ".mp3":
         return mp3_path
-    wav_path = tempfile.mktemp(suffix=".wav")
+    cached_path = AUDIO_CACHE_DIR / f"{_audio_cache_key(mp3_path)}.wav"
+    if cached_path.exists():
+        try:
+            # Mark as recently used so eviction drops older conversions first
+            os.utime(cached_path)
+        except OSError:
+            pass  # Evicted by another run in the meantime; convert it again below
+        else:
+            print(f"Reusing converted WAV: {cached_path}")
+            return str(cached_path)
+    AUDIO_CACHE_DIR.mkdir(parents=True, exist_ok=True)
+    # Convert under a temporary name so an interrupted run never leaves a partial cache entry
+    with tempfile.NamedTemporaryFile(suffix=".wav", dir=AUDIO_CACHE_DIR, delete=False) as tf:
+        wav_path = tf.name
     cmd = [
         "ffmpeg", "-y", "-i", mp3_path,
         "-ac", "2", "-ar", "44100", "-acodec", "pcm_s16le", wav_path
     ]
     try:
-        subprocess.run(cmd, check=True, capture_output=True)
-        print(f"Converted MP3 to temporary WAV: {wav_path}")
-        return wav_path
-    except subprocess.CalledProcessError as e:
-        print(f"FFmpeg conversion failed: {e.stderr.decode()}")
+        subprocess.run(cmd, check=True, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE)
+        os.replace(wav_path, cached_path)
+        prune_audio_cache(keep=cached_path)
+        print(f"Converted MP3 to cached WAV: {cached_path}")
+        return str(cached_path)
+    except (subprocess.CalledProcessError, OSError) as e:
+        print(f"FFmpeg conversion failed: {ffmpeg_error(e)}")
+        os.unlink(wav_path)
         return mp3_path
 
 # =========================
 # AUDIO UTILITY FUNCTIONS SECTION
 # =========================
 
+def _silent_frame(t):
+    """Frame function for silence, generated on demand during render"""
+    if np.ndim(t) == 0:
+        return np.zeros(2, dtype=np.float32)
+    return np.zeros((len(t), 2), dtype=np.float32)
+
 def build_audio_with_fades_and_padding(audio_clip, fades, total_duration):
     """Handles multiple fades with padding"""
-    fades = sorted(fades, key=lambda x: x[1])
-    segments = []
-    fps = audio_clip.fps
+    if any(fades[i][1] > fades[i + 1][1] for i in range(len(fades) - 1)):
+        fades = sorted(fades, key=lambda x: x[1])
+    # Gain pieces in placement order; later pieces win, gaps before fades stay silent
+    pieces = []
     prev_end = 0
     for idx, (fade_type, fade_start, fade_duration) in enumerate(fades):
         fade_end = fade_start + fade_duration
-        if fade_start > prev_end:
-            silence = AudioArrayClip(np.zeros((int((fade_start - prev_end) * fps), 2)), fps=fps)
-            segments.append(silence)
-        seg = audio_clip.subclipped(fade_start, fade_end)
-        if fade_type == "in":
-            seg = seg.with_effects([AudioFadeIn(fade_duration)])
-        elif fade_type == "out":
-            seg = seg.with_effects([AudioFadeOut(fade_duration)])
-        segments.append(seg)
+        pieces.append((fade_start, fade_end, fade_type))
         prev_end = fade_end
         # Handle space between fades
         if fade_type == "in" and idx + 1 < len(fades):
             next_fade_type, next_fade_start, _ = fades[idx + 1]
             if next_fade_type == "out" and next_fade_start > prev_end:
-                full_vol = audio_clip.subclipped(prev_end, next_fade_start)
-                segments.append(full_vol)
+                pieces.append((prev_end, next_fade_start, None))
                 prev_end = next_fade_start
     if prev_end < total_duration:
-        remaining = audio_clip.subclipped(prev_end, total_duration)
-        segments.append(remaining)
-    total_length = sum([s.duration for s in segments])
-    if total_length < total_duration:
-        silence = AudioArrayClip(np.zeros((int((total_duration - total_length) * fps), 2)), fps=fps)
-        segments.append(silence)
-    return concatenate_audioclips(segments)
+        pieces.append((prev_end, total_duration, None))
+    source_end = audio_clip.duration
+
+    def fade_frame(get_frame, t):
+        t_arr = np.atleast_1d(t)
+        gain = np.zeros(len(t_arr), dtype=np.float32)
+        for start, end, fade_type in pieces:
+            mask = (t_arr >= start) & (t_arr < end)
+            if fade_type == "in":
+                gain[mask] = (t_arr[mask] - start) / (end - start)
+            elif fade_type == "out":
+                gain[mask] = (end - t_arr[mask]) / (end - start)
+            else:
+                gain[mask] = 1
+        # Past the end of the soundtrack there is nothing to read, only silence
+        gain[t_arr >= source_end] = 0
+        frame = get_frame(np.minimum(t, source_end - 1 / audio_clip.fps))
+        if np.ndim(t) == 0:
+            return frame * gain[0]
+        return frame * (gain[:, None] if frame.ndim == 2 else gain)
+
+    # Apply the gain chunk by chunk as the soundtrack streams instead of decoding it whole
+    return audio_clip.transform(fade_frame).with_duration(total_duration)
 
 def mute_audio_segments(audio_clip, mute_segments):
     """Mute (silence) specified segments of an audio clip."""
-    fps = audio_clip.fps
-    total_duration = audio_clip.duration
-    segments = []
-    last_end = 0.0
-    for start, end in sorted(mute_segments):
-        if last_end < start:
-            segments.append(audio_clip.subclipped(last_end, start))
-        silence = AudioArrayClip(np.zeros((int((end - start) * fps), 2)), fps=fps).with_duration(end - start)
-        segments.append(silence)
-        last_end = end
-    if last_end < total_duration:
-        segments.append(audio_clip.subclipped(last_end, total_duration))
-    return concatenate_audioclips(segments).with_duration(total_duration)
+    segs = np.array(sorted(mute_segments), dtype=np.float64).reshape(-1, 2)
+    starts = segs[:, 0]
+    # Running max of the ends keeps lookups correct even if segments overlap
+    ends = np.maximum.accumulate(segs[:, 1])
+
+    def mute_frame(get_frame, t):
+        frame = get_frame(t)
+        idx = np.searchsorted(starts, t, side="right") - 1
+        muted = (idx >= 0) & (t < ends[np.maximum(idx, 0)])
+        if np.ndim(t) == 0:
+            return np.zeros_like(frame) if muted else frame
+        if muted.any():
+            frame = frame.copy()
+            frame[muted] = 0
+        return frame
+
+    # Zero muted samples chunk by chunk as the source streams, no subclip seeks
+    return audio_clip.transform(mute_frame)
 
 # =========================
 # GENERAL FUNCTIONS SECTION
@@ -166,8 +329,19 @@ def get_valid_input(prompt, invalid_responses=None, default=None):
         else:
             return user_input
 
+def _list_dir_names(directory):
+    try:
+        with os.scandir(directory or ".") as entries:
+            return {os.path.normcase(e.name) for e in entries}
+    except OSError:
+        return set()
+
 def check_overwrite(output_path):
-    while os.path.exists(output_path):
+    # One directory listing replaces a stat per candidate name
+    out_dir = os.path.dirname(output_path)
+    existing = _list_dir_names(out_dir)
+    ext = os.path.splitext(output_path)[1]
+    while os.path.normcase(os.path.basename(output_path)) in existing:
         overwrite = get_valid_input(
             f"File {output_path} already exists. Overwrite? (y/n/q to enter new name): ",
             invalid_responses=set()
@@ -180,59 +354,106 @@ def check_overwrite(output_path):
             new_name = input("Enter new filename (or 'q' to quit): ").strip()
             if new_name.lower() == "q":
                 return None
-            base, ext = os.path.splitext(output_path)
             if not new_name:
-                new_name = os.path.basename(base) + "_NEW" + ext
+                new_name = os.path.splitext(os.path.basename(output_path))[0] + "_NEW" + ext
             elif not new_name.endswith(ext):
                 new_name += ext
-            output_path = os.path.join(os.path.dirname(output_path), new_name)
+            output_path = os.path.join(out_dir, new_name)
+            if os.path.dirname(output_path) != out_dir:
+                out_dir = os.path.dirname(output_path)
+                existing = _list_dir_names(out_dir)
     return output_path
 
 def get_timestamp(prompt, video_duration, default=0.0):
-    user_input = input(prompt).strip().lower()
-    if not user_input:
-        return default
-    if user_input in ("start", "from start"):
-        return 0.0
-    if user_input in ("end", "until end"):
-        return video_duration
-    if ':' in user_input:
-        parts = user_input.split(':')
+    while True:
+        user_input = input(prompt).strip().lower()
+        if not user_input:
+            return default
+        if user_input in ("from start", "until end"):
+            user_input = user_input.split()[-1]
         try:
-            if len(parts) == 2:
-                return float(parts[0]) * 60 + float(parts[1])
-            elif len(parts) == 3:
-                return float(parts[0]) * 3600 + float(parts[1]) * 60 + float(parts[2])
-        except Exception:
-            print("Invalid timestamp format. Please enter as seconds or MM:SS or HH:MM:SS.")
-            return get_timestamp(prompt, video_duration, default)
-    try:
-        return float(user_input)
-    except ValueError:
-        print("Invalid timestamp. Please enter as seconds or MM:SS or HH:MM:SS.")
-        return get_timestamp(prompt, video_duration, default)
+            return parse_timestamp_string(user_input, video_duration)
+        except ValueError:
+            print("Invalid timestamp. Please enter as seconds or MM:SS or HH:MM:SS.")
+
+_TS_RE = re.compile(r'^(\d*\.?\d+)(?::(\d*\.?\d+))?(?::(\d*\.?\d+))?$')
 
 def parse_timestamp_string(s, video_duration):
+    seconds = _parse_ts_cached(s)
+    return video_duration if seconds is None else seconds
+
+# Independent of the video, so one cache serves every call; None means "end"
+@functools.lru_cache(maxsize=131072)
+def _parse_ts_cached(s):
     s = s.strip().lower()
     if s == "start":
         return 0.0
     if s == "end":
-        return video_duration
-    if ':' in s:
-        parts = list(map(float, s.split(':')))
-        if len(parts) == 2:
-            return parts[0] * 60 + parts[1]
-        elif len(parts) == 3:
-            return parts[0] * 3600 + parts[1] * 60 + parts[2]
-        else:
+        return None
+    m = _TS_RE.match(s)
+    if m is None:
+        # Anything float() takes ("5.", "+5", "1e2") is still a valid timestamp
+        if ':' in s:
+            parts = list(map(float, s.split(':')))
+            if len(parts) == 2:
+                return parts[0] * 60 + parts[1]
+            if len(parts) == 3:
+                return parts[0] * 3600 + parts[1] * 60 + parts[2]
             raise ValueError(f"Invalid time format: {s}")
-    try:
-        return float(s)
-    except ValueError:
-        raise ValueError(f"Could not parse timestamp: {s}")
+        try:
+            return float(s)
+        except ValueError:
+            raise ValueError(f"Could not parse timestamp: {s}")
+    a, b, c = m.groups()
+    if c is not None:
+        return float(a) * 3600 + float(b) * 60 + float(c)
+    if b is not None:
+        return float(a) * 60 + float(b)
+    return float(a)
+
+def merge_segments(segments):
+    """Sorts (start, end) segments and merges overlapping/adjacent ones"""
+    if not segments:
+        return []
+    segs = np.array(segments, dtype=np.float64)
+    segs = segs[np.argsort(segs[:, 0], kind="stable")]
+    starts, ends = segs[:, 0], segs[:, 1]
+    # A new merged segment begins wherever a start lies past every earlier end
+    new_group = np.concatenate(([True], starts[1:] > np.maximum.accumulate(ends)[:-1]))
+    group_idx = np.flatnonzero(new_group)
+    return list(zip(starts[group_idx].tolist(), np.maximum.reduceat(ends, group_idx).tolist()))
+
+def subtract_segments(segments, removals):
+    """Returns the parts of merged segments not covered by merged removals (both sorted)"""
+    result = []
+    j = 0
+    for start, end in segments:
+        while j < len(removals) and removals[j][1] <= start:
+            j += 1
+        k = j
+        while k < len(removals) and removals[k][0] < end:
+            if removals[k][0] > start:
+                result.append((start, removals[k][0]))
+            start = max(start, removals[k][1])
+            k += 1
+        if start < end:
+            result.append((start, end))
+    return result
+
+def _same_size_fps(clips):
+    """True if every clip shares the first clip's frame size and fps"""
+    size, fps = tuple(clips[0].size), clips[0].fps
+    return all(tuple(c.size) == size and c.fps == fps for c in clips[1:])
+
+_POS_KEYWORDS = frozenset({"left", "center", "right", "top", "bottom"})
+_NUMBER_PCT_RE = re.compile(r'^(-?\d*\.?\d+)\s*(%?)$')
 
 def parse_percentage_input(user_input: str) -> float:
     user_input = user_input.strip()
+    m = _NUMBER_PCT_RE.match(user_input)
+    if m is not None:
+        return float(m.group(1)) / 100
+    # Anything float() takes ("25.", "+25", "1e1") is still a valid percentage
     if user_input.endswith('%'):
         user_input = user_input[:-1].strip()
     try:
@@ -243,43 +464,187 @@ def parse_percentage_input(user_input: str) -> float:
 
 def parse_position_input(user_input):
     user_input = user_input.strip().lower()
-    if user_input in ("left", "center", "right", "top", "bottom"):
+    if user_input in _POS_KEYWORDS:
         return user_input
-    if user_input.endswith('%'):
-        try:
-            return float(user_input.strip('%')) / 100
-        except ValueError:
-            pass
-    try:
-        val = float(user_input)
+    m = _NUMBER_PCT_RE.match(user_input)
+    if m is not None:
+        val = float(m.group(1))
+        if m.group(2) == '%':
+            return val / 100
         if 0 <= val <= 1:
             return val
         elif 1 < val <= 100:
             return val / 100
-    except ValueError:
-        pass
+    else:
+        # Fall back to float() for forms the regex skips, such as "50." or "+50"
+        if user_input.endswith('%'):
+            try:
+                return float(user_input.strip('%')) / 100
+            except ValueError:
+                pass
+        try:
+            val = float(user_input)
+            if 0 <= val <= 1:
+                return val
+            elif 1 < val <= 100:
+                return val / 100
+        except ValueError:
+            pass
     print("Invalid position input, defaulting to 'center'")
     return "center"
 #----- Composite Functions -------
 
-def add_graphic_to_video(video, config):
-    from moviepy.video.VideoClip import ImageClip
-    from moviepy.video.compositing.CompositeVideoClip import CompositeVideoClip
-    from moviepy import vfx
+# Keyword -> index into (near edge, center, far edge) per axis
+_H_POS_IDX = {"left": 0, "center": 1, "right": 2}
+_V_POS_IDX = {"top": 0, "center": 1, "bottom": 2}
 
-    graphics = []
-    while True:
+def _resolve_position(axis_len, obj_len, pos, margin_px, pos_idx):
+    """Resolves one axis of a keyword or fractional position, clamped to the video"""
+    free = axis_len - obj_len
+    if isinstance(pos, float):
+        value = int(pos * free)
+    else:
+        value = (margin_px, free // 2, free - margin_px)[pos_idx.get(pos, 1)]
+    return max(0, min(free, value))
+
+@functools.lru_cache(maxsize=256)
+def _compute_overlay_xy(video_wh, clip_wh, h_pos, v_pos, margin_px):
+    """Resolves keyword or fractional positions to pixel coordinates clamped to the video"""
+    return (
+        _resolve_position(video_wh[0], clip_wh[0], h_pos, margin_px, _H_POS_IDX),
+        _resolve_position(video_wh[1], clip_wh[1], v_pos, margin_px, _V_POS_IDX),
+    )
+
+def _build_overlays(builder, video_size, specs):
+    """Builds overlay clips concurrently; image and text rasterization run in native code"""
+    with ThreadPoolExecutor(max_workers=min(8, len(specs))) as executor:
+        return list(executor.map(lambda spec: builder(video_size, spec), specs))
+
+@functools.lru_cache(maxsize=32)
+def _load_image_clip(path):
+    """Decodes an image once per path; with_* calls copy the cached clip"""
+    return ImageClip(path)
+
+def _build_graphic(video_size, spec):
+    graphic = _load_image_clip(spec["path"]).with_duration(spec["duration"]).with_start(spec["start"])
+
+    # Fade-in and fade-out (using crossfade for best results)
+    effects = []
+    if spec["fadein"] > 0:
+        effects.append(vfx.CrossFadeIn(spec["fadein"]))
+    if spec["fadeout"] > 0:
+        effects.append(vfx.CrossFadeOut(spec["fadeout"]))
+    if effects:
+        graphic = graphic.with_effects(effects)
+
+    if spec["resize"]:
+        graphic = graphic.resized(**spec["resize"])
+
+    pos_x, pos_y = _compute_overlay_xy(video_size, tuple(graphic.size), spec["horizontal"], spec["vertical"], spec["margin_px"])
+    return graphic.with_position((pos_x, pos_y))
+
+@functools.lru_cache(maxsize=256)
+def _make_text_clip(text, style_items):
+    """Rasterizes a caption once per unique text and style; with_* calls copy the cached clip"""
+    return TextClip(text=text, **dict(style_items))
+
+def _build_caption(video_size, spec, style):
+    clip = _make_text_clip(spec["text"], tuple(style.items())).with_duration(spec["duration"]).with_start(spec["start"])
+
+    margin_px = 30  # Extra margin for position
+
+    pos_x, pos_y = _compute_overlay_xy(video_size, tuple(clip.size), spec["horizontal"], spec["vertical"], margin_px)
+    clip = clip.with_position((pos_x, pos_y))
+
+    # --- Use CrossFadeIn/CrossFadeOut for clean fades ---
+    effects = []
+    if spec["fadein"] > 0:
+        effects.append(vfx.CrossFadeIn(spec["fadein"]))
+    if spec["fadeout"] > 0:
+        effects.append(vfx.CrossFadeOut(spec["fadeout"]))
+    if effects:
+        clip = clip.with_effects(effects)
+    return clip
+
+def _graphic_spec_from_dict(g, video_duration):
+    """Converts one 'graphics' entry of the spec file to a graphic spec"""
+    duration = str(g.get("duration", "all")).strip().lower()
+    if duration == "all":
+        graphic_duration = video_duration
+        start_time = 0.0
+    else:
+        graphic_duration = float(duration)
+        start_time = parse_timestamp_string(str(g.get("start", "start")), video_duration)
+    scale = g.get("scale") or {}
+    if "percent" in scale:
+        resize = {"new_size": parse_percentage_input(str(scale["percent"]))}
+    else:
+        resize = {k: int(scale[k]) for k in ("width", "height") if k in scale} or None
+    return {
+        "path": g["path"],
+        "duration": graphic_duration,
+        "start": start_time,
+        "fadein": float(g.get("fadein", 0)),
+        "fadeout": float(g.get("fadeout", 0)),
+        "resize": resize,
+        "horizontal": parse_position_input(str(g.get("horizontal", "center"))),
+        "vertical": parse_position_input(str(g.get("vertical", "center"))),
+        "margin_px": 10,
+    }
+
+def _caption_spec_from_dict(c, video_duration):
+    """Converts one 'captions' entry of the spec file to a caption spec"""
+    return {
+        "text": c["text"],
+        "start": parse_timestamp_string(str(c.get("start", "start")), video_duration),
+        "duration": float(c.get("duration", 5)),
+        "fadein": float(c.get("fadein", 0)),
+        "fadeout": float(c.get("fadeout", 0)),
+        "horizontal": parse_position_input(str(c.get("horizontal", "center"))),
+        "vertical": parse_position_input(str(c.get("vertical", "bottom"))),
+    }
+
+def _caption_style_from_dict(s, video_size, config):
+    """Builds TextClip settings from the spec file's 'caption_style', with the prompt defaults"""
+    advanced = s.get("mode", "simple") == "advanced"
+    return {
+        "font": s.get("font") or config.get("font") or None,
+        "font_size": int(s.get("font_size", 70)),
+        "color": s.get("color", "white"),
+        "method": "caption" if advanced else "label",
+        "size": (int(video_size[0] * 0.90), int(video_size[1] * 0.50)) if advanced else (None, None),
+        "bg_color": s.get("bg_color"),
+        "stroke_color": s.get("stroke_color"),
+        "stroke_width": int(s.get("stroke_width", 0)),
+        "interline": int(s.get("interline", 4)),
+        "text_align": s.get("align", "center"),
+        "vertical_align": "center",
+        "transparent": bool(s.get("transparent", True)),
+        "margin": (40, 40),
+    }
+
+def add_graphic_to_video(video, config):
+    # Scripted runs take every graphic from the spec file instead of prompting
+    graphic_specs = [_graphic_spec_from_dict(g, video.duration) for g in SPEC.get("graphics", [])]
+    while "graphics" not in SPEC:
         add_graphic = get_valid_input(
             "Add a graphic? (y/n): ", invalid_responses=set()
         ).strip().lower()
         if add_graphic != "y":
             break
 
-        graphic_path = get_input(
-            "Enter the path to the graphic image (PNG recommended): ",
-            "graphic",
-            config
-        )
+        while True:
+            graphic_path = get_input(
+                "Enter the path to the graphic image (PNG recommended): ",
+                "graphic",
+                config
+            )
+            if os.path.exists(graphic_path):
+                break
+            print(f"Graphic not found: {graphic_path}")
+            # Forget the bad path so the next attempt asks for a new one
+            config.pop("graphic", None)
+            save_config(config)
 
         # Duration and conditional start time
         duration_input = get_valid_input(
@@ -297,9 +662,6 @@ def add_graphic_to_video(video, config):
                 video.duration
             )
 
-        # Create graphic with start time and duration
-        graphic = ImageClip(graphic_path).with_duration(graphic_duration).with_start(start_time)
-
         # Fade-in and fade-out (using crossfade for best results)
         fadein_input = get_valid_input("Fade-in duration in seconds (default 0): ", invalid_responses={"y", "n"})
         fadeout_input = get_valid_input("Fade-out duration in seconds (default 0): ", invalid_responses={"y", "n"})
@@ -311,15 +673,8 @@ def add_graphic_to_video(video, config):
             print("Invalid fade duration. Using 0.")
             fadein_duration = fadeout_duration = 0.0
 
-        effects = []
-        if fadein_duration > 0:
-            effects.append(vfx.CrossFadeIn(fadein_duration))
-        if fadeout_duration > 0:
-            effects.append(vfx.CrossFadeOut(fadeout_duration))
-        if effects:
-            graphic = graphic.with_effects(effects)
-
         # Scaling
+        resize = None
         scale = get_valid_input("Do you want to scale the graphic? (y/n): ", invalid_responses=set()).strip().lower()
         if scale == 'y':
             scale_mode = get_valid_input(
@@ -329,7 +684,7 @@ def add_graphic_to_video(video, config):
             if scale_mode == '%':
                 percent_input = get_valid_input("Enter scale percentage (e.g., 25 or 25%): ", invalid_responses={"y", "n"})
                 scale_factor = parse_percentage_input(percent_input)
-                graphic = graphic.resized(scale_factor)
+                resize = {"new_size": scale_factor}
             elif scale_mode == 'pixels':
                 width_or_height = get_valid_input(
                     "Scale by width, height, or both? (width/height/both): ",
@@ -337,17 +692,16 @@ def add_graphic_to_video(video, config):
                 ).strip().lower()
                 if width_or_height == 'width':
                     new_width = int(get_valid_input("New width in pixels: ", invalid_responses={"y", "n"}))
-                    graphic = graphic.resized(width=new_width)
+                    resize = {"width": new_width}
                 elif width_or_height == 'height':
                     new_height = int(get_valid_input("New height in pixels: ", invalid_responses={"y", "n"}))
-                    graphic = graphic.resized(height=new_height)
+                    resize = {"height": new_height}
                 elif width_or_height == 'both':
                     new_width = int(get_valid_input("New width in pixels: ", invalid_responses={"y", "n"}))
                     new_height = int(get_valid_input("New height in pixels: ", invalid_responses={"y", "n"}))
-                    graphic = graphic.resized(width=new_width, height=new_height)
+                    resize = {"width": new_width, "height": new_height}
 
         # Positioning with symmetric margins
-        graphic_w, graphic_h = graphic.size
         margin_px = 10
 
         horizontal_input = get_valid_input(
@@ -361,44 +715,20 @@ def add_graphic_to_video(video, config):
         horizontal = parse_position_input(horizontal_input)
         vertical = parse_position_input(vertical_input)
 
-        # X position
-        if isinstance(horizontal, str):
-            if horizontal == "left":
-                pos_x = margin_px
-            elif horizontal == "center":
-                pos_x = (video.w - graphic_w) // 2
-            elif horizontal == "right":
-                pos_x = video.w - graphic_w - margin_px
-            else:
-                pos_x = (video.w - graphic_w) // 2
-        elif isinstance(horizontal, float):
-            pos_x = int(horizontal * (video.w - graphic_w))
-        else:
-            pos_x = (video.w - graphic_w) // 2
-
-        # Y position
-        if isinstance(vertical, str):
-            if vertical == "top":
-                pos_y = margin_px
-            elif vertical == "center":
-                pos_y = (video.h - graphic_h) // 2
-            elif vertical == "bottom":
-                pos_y = video.h - graphic_h - margin_px
-            else:
-                pos_y = (video.h - graphic_h) // 2
-        elif isinstance(vertical, float):
-            pos_y = int(vertical * (video.h - graphic_h))
-        else:
-            pos_y = (video.h - graphic_h) // 2
-
-        # Clamp to video bounds (optional)
-        pos_x = max(0, min(video.w - graphic_w, pos_x))
-        pos_y = max(0, min(video.h - graphic_h, pos_y))
-
-        graphic = graphic.with_position((pos_x, pos_y))
-        graphics.append(graphic)
-
-    if graphics:
+        graphic_specs.append({
+            "path": graphic_path,
+            "duration": graphic_duration,
+            "start": start_time,
+            "fadein": fadein_duration,
+            "fadeout": fadeout_duration,
+            "resize": resize,
+            "horizontal": horizontal,
+            "vertical": vertical,
+            "margin_px": margin_px,
+        })
+
+    if graphic_specs:
+        graphics = _build_overlays(_build_graphic, tuple(video.size), graphic_specs)
         return CompositeVideoClip([video] + graphics)
     else:
         return video
@@ -406,8 +736,6 @@ def add_graphic_to_video(video, config):
 def get_caption_settings(config, mode, video_width):
     # Only update the font in the config file
     font_path = get_input("Font name or path: ", "font", config)
-    config['font'] = font_path
-    save_config(config)
 
     # The rest of the settings are session-only, not saved in config
     settings = {}
@@ -429,12 +757,18 @@ def get_caption_settings(config, mode, video_width):
     return settings
 
 def add_captions_to_video(video, config):
-    from moviepy import TextClip, CompositeVideoClip, vfx
-    captions = []
+    if "captions" in SPEC:
+        # Scripted runs take the style and every caption from the spec file instead of prompting
+        style = _caption_style_from_dict(SPEC.get("caption_style", {}), video.size, config)
+        caption_specs = [_caption_spec_from_dict(c, video.duration) for c in SPEC["captions"]]
+        if not caption_specs:
+            return video
+        captions = _build_overlays(functools.partial(_build_caption, style=style), tuple(video.size), caption_specs)
+        return CompositeVideoClip([video] + captions)
+
+    caption_specs = []
     mode = input("Use simple or advanced caption settings? (simple/advanced): ").strip().lower()
     font_path = get_input("Font name or path: ", "font", config)
-    config['font'] = font_path
-    save_config(config)
     font_size = int(get_valid_input("Font size (e.g. 70): ", invalid_responses={"y", "n"}, default="70"))
     color = get_valid_input("Font color (default white): ", invalid_responses={"y", "n"}, default="white")
 #     font_size = int(get_valid_input("Font size (e.g. 70): ").strip() or "70")
@@ -493,88 +827,45 @@ def add_captions_to_video(video, config):
         vertical = get_valid_input("Vertical position (top/center/bottom or %): ", invalid_responses={"y", "n"}, default="bottom")
 
 
-        # Create the TextClip
-        clip = TextClip(
-            text=text,
-            font=font_path,
-            font_size=font_size,
-            color=color,
-            method=method,
-            size=size,
-            bg_color=bg_color,
-            stroke_color=stroke_color,
-            stroke_width=stroke_width,
-            interline=interline,
-            text_align=align,
-            vertical_align=vertical_align,
-            transparent=transparent,
-            margin=margin
-        ).with_duration(duration).with_start(start_time)
-
-        clip_w, clip_h = clip.size
-        margin_px = 30  # Extra margin for position
-
-        # Positioning logic
-        if isinstance(horizontal, str):
-            if horizontal == "left":
-                pos_x = margin_px
-            elif horizontal == "center":
-                pos_x = (video.w - clip_w) // 2
-            elif horizontal == "right":
-                pos_x = video.w - clip_w - margin_px
-            else:
-                pos_x = (video.w - clip_w) // 2
-        elif isinstance(horizontal, float):
-            pos_x = int(horizontal * (video.w - clip_w))
-        else:
-            pos_x = (video.w - clip_w) // 2
-
-        if isinstance(vertical, str):
-            if vertical == "top":
-                pos_y = margin_px
-            elif vertical == "center":
-                pos_y = (video.h - clip_h) // 2
-            elif vertical == "bottom":
-                pos_y = video.h - clip_h - margin_px
-            else:
-                pos_y = (video.h - clip_h) // 2
-        elif isinstance(vertical, float):
-            pos_y = int(vertical * (video.h - clip_h))
-        else:
-            pos_y = (video.h - clip_h) // 2
-
-        pos_x = max(0, min(video.w - clip_w, pos_x))
-        pos_y = max(0, min(video.h - clip_h, pos_y))
-
-        clip = clip.with_position((pos_x, pos_y))
-
-        # --- Use CrossFadeIn/CrossFadeOut for clean fades ---
-        effects = []
-        if fadein > 0:
-            effects.append(vfx.CrossFadeIn(fadein))
-        if fadeout > 0:
-            effects.append(vfx.CrossFadeOut(fadeout))
-        if effects:
-            clip = clip.with_effects(effects)
-
-        captions.append(clip)
-
-    if captions:
+        caption_specs.append({
+            "text": text,
+            "start": start_time,
+            "duration": duration,
+            "fadein": fadein,
+            "fadeout": fadeout,
+            "horizontal": horizontal,
+            "vertical": vertical,
+        })
+
+    if caption_specs:
+        style = {
+            "font": font_path,
+            "font_size": font_size,
+            "color": color,
+            "method": method,
+            "size": size,
+            "bg_color": bg_color,
+            "stroke_color": stroke_color,
+            "stroke_width": stroke_width,
+            "interline": interline,
+            "text_align": align,
+            "vertical_align": vertical_align,
+            "transparent": transparent,
+            "margin": margin,
+        }
+        captions = _build_overlays(functools.partial(_build_caption, style=style), tuple(video.size), caption_specs)
         return CompositeVideoClip([video] + captions)
     else:
         return video
 
+_SAFE_POS_EDGE = {"left": 0.0, "top": 0.0, "center": 0.5, "right": 1.0, "bottom": 1.0}
+
 def safe_position(pos, safe_margin_frac=0.10):
-    if pos == "left" or pos == "top":
-        return safe_margin_frac
-    elif pos == "right" or pos == "bottom":
-        return 1.0 - safe_margin_frac
-    elif pos == "center":
-        return 0.5
-    elif isinstance(pos, float):
+    if isinstance(pos, float):
         return pos
-    else:
-        return 0.5
+    edge = _SAFE_POS_EDGE.get(pos, 0.5)
+    # Edges move inward by the safe margin; center stays at 0.5
+    return edge + safe_margin_frac * (1.0 - 2.0 * edge)
 
 # =========================
 # EDL PARSING SECTION
@@ -582,37 +873,244 @@ def safe_position(pos, safe_margin_frac=0.10):
 
 def load_edl_csv(file_path, video_duration, strict=False):
     operations = []
+    row_numbers = []
+    errors = []  # (row number, message), reported in row order once both passes are done
     with open(file_path, newline='', encoding='utf-8') as csvfile:
-        reader = csv.DictReader(csvfile)
-        for row_idx, row in enumerate(reader, 1):
+        reader = csv.reader(csvfile)
+        # Resolve column positions once instead of building a dict per row
+        columns = {name: i for i, name in enumerate(next(reader, []))}
+        action_i = columns.get('action', -1)
+        in_i = columns.get('record_in', -1)
+        out_i = columns.get('record_out', -1)
+        for row_idx, row in enumerate(filter(None, reader), 1):
             try:
-                action = row.get('action', '').strip().lower()
+                n = len(row)
+                action = row[action_i].strip().lower() if 0 <= action_i < n else ''
                 op = {'action': action}
-                if 'record_in' in row and row['record_in']:
-                    op['record_in'] = parse_timestamp_string(row['record_in'], video_duration)
-                if 'record_out' in row and row['record_out']:
-                    op['record_out'] = parse_timestamp_string(row['record_out'], video_duration)
+                if 0 <= in_i < n and row[in_i]:
+                    op['record_in'] = parse_timestamp_string(row[in_i], video_duration)
+                if 0 <= out_i < n and row[out_i]:
+                    op['record_out'] = parse_timestamp_string(row[out_i], video_duration)
                 if action in {'remove', 'keep'}:
                     if op.get('record_in') is None or op.get('record_out') is None:
                         raise ValueError(f"Missing record_in or record_out for action '{action}'")
-                    if not (0 <= op['record_in'] < op['record_out'] <= video_duration):
-                        raise ValueError(f"Invalid time range: {op['record_in']:.2f}-{op['record_out']:.2f}s")
                 operations.append(op)
+                row_numbers.append(row_idx)
             except Exception as e:
-                if strict:
-                    raise ValueError(f"Error in row {row_idx}: {e}") from e
-                else:
-                    print(f"Skipping invalid row {row_idx}: {e}")
+                errors.append((row_idx, str(e)))
+
+    # Validate all remove/keep time ranges in one vectorized pass
+    ranged = [i for i, op in enumerate(operations) if op['action'] in {'remove', 'keep'}]
+    if ranged:
+        record_in = np.array([operations[i]['record_in'] for i in ranged])
+        record_out = np.array([operations[i]['record_out'] for i in ranged])
+        valid = (record_in >= 0) & (record_in < record_out) & (record_out <= video_duration)
+        if not valid.all():
+            invalid = set()
+            for k in np.flatnonzero(~valid):
+                i = ranged[k]
+                errors.append((row_numbers[i], f"Invalid time range: {record_in[k]:.2f}-{record_out[k]:.2f}s"))
+                invalid.add(i)
+            operations = [op for i, op in enumerate(operations) if i not in invalid]
+
+    errors.sort(key=lambda e: e[0])
+    if strict and errors:
+        raise ValueError(f"Error in row {errors[0][0]}: {errors[0][1]}")
+    for row_idx, error in errors:
+        print(f"Skipping invalid row {row_idx}: {error}")
     return operations
 
+# =========================
+# FFMPEG STREAM COPY SECTION
+# =========================
+
+def probe_keyframes(source_path):
+    """Returns the sorted keyframe times of the first video stream, read from packet flags,
+    relative to the start of the file like the segment times and ffmpeg's input -ss"""
+    cmd = [
+        "ffprobe", "-v", "error", "-select_streams", "v:0",
+        "-show_entries", "packet=pts_time,flags", "-of", "csv=p=0", source_path
+    ]
+    result = subprocess.run(cmd, check=True, capture_output=True, text=True)
+    times = []
+    for line in result.stdout.splitlines():
+        pts_time, _, flags = line.partition(",")
+        if "K" in flags and pts_time not in ("", "N/A"):
+            times.append(float(pts_time))
+    # pts_time is absolute; MPEG-TS sources in particular usually start well above zero
+    return np.unique(np.array(times, dtype=np.float64)) - probe_start_time(source_path)
+
+def probe_duration(path):
+    cmd = ["ffprobe", "-v", "error", "-show_entries", "format=duration", "-of", "csv=p=0", path]
+    result = subprocess.run(cmd, check=True, capture_output=True, text=True)
+    return float(result.stdout.strip())
+
+def probe_start_time(path):
+    cmd = ["ffprobe", "-v", "error", "-show_entries", "format=start_time", "-of", "csv=p=0", path]
+    result = subprocess.run(cmd, check=True, capture_output=True, text=True)
+    start_time = result.stdout.strip()
+    return float(start_time) if start_time not in ("", "N/A") else 0.0
+
+def snap_segments_to_keyframes(segments, keyframes, tolerance=0.001):
+    """Moves each segment start forward to the next keyframe; None if a segment has none inside it"""
+    idx = np.searchsorted(keyframes, np.array([start for start, _ in segments]) - tolerance)
+    snapped = []
+    for (start, end), i in zip(segments, idx):
+        if i >= len(keyframes) or keyframes[i] >= end:
+            return None
+        snapped.append((max(start, float(keyframes[i])), end))
+    return snapped
+
+def stream_copy_segments(source_path, segments, output_path):
+    """Cuts keyframe-aligned segments with ffmpeg stream copy in parallel, then joins them with the
+    concat demuxer. Returns False, without writing output_path, if the cuts cannot be copied cleanly."""
+    # A copy can only start on a keyframe; seeking anywhere else drags the GOP pre-roll
+    # (footage the user removed) into the output
+    segments = snap_segments_to_keyframes(segments, probe_keyframes(source_path))
+    if segments is None:
+        print("A kept segment has no keyframe to start from; stream copy is not possible.")
+        return False
+    expected = sum(end - start for start, end in segments)
+
+    ext = os.path.splitext(output_path)[1] or ".mp4"
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        seg_names = [f"seg_{i}{ext}" for i in range(len(segments))]
+
+        def cut_segment(job):
+            (start, end), seg_name = job
+            cmd = [
+                "ffmpeg", "-y", "-ss", f"{start:.6f}", "-i", source_path, "-t", f"{end - start:.6f}",
+                "-c", "copy", os.path.join(tmp_dir, seg_name)
+            ]
+            subprocess.run(cmd, check=True, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE)
+
+        with ThreadPoolExecutor(max_workers=min(os.cpu_count() or 1, len(segments))) as executor:
+            list(executor.map(cut_segment, zip(segments, seg_names)))
+
+        list_path = os.path.join(tmp_dir, "list.txt")
+        with open(list_path, "w", encoding="utf-8") as f:
+            f.writelines(f"file '{seg_name}'\n" for seg_name in seg_names)
+        joined_path = os.path.join(tmp_dir, f"joined{ext}")
+        cmd = ["ffmpeg", "-y", "-f", "concat", "-safe", "0", "-i", list_path, "-c", "copy", joined_path]
+        subprocess.run(cmd, check=True, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE)
+
+        # Copied cuts may run a few frames past each end (decode-order packets), never whole GOPs
+        duration = probe_duration(joined_path)
+        if abs(duration - expected) > 0.1 + 0.1 * len(segments):
+            print(f"Stream copy produced {duration:.2f}s instead of {expected:.2f}s of kept footage.")
+            return False
+        shutil.move(joined_path, output_path)
+    return True
+
+def mux_original_audio(video_only_path, source_path, output_path):
+    """Muxes a rendered video-only file with the source's untouched audio, copying both streams"""
+    cmd = [
+        "ffmpeg", "-y", "-i", video_only_path, "-i", source_path,
+        "-map", "0:v:0", "-map", "1:a:0", "-c", "copy", output_path
+    ]
+    subprocess.run(cmd, check=True, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE)
+
+def mux_silent_audio(video_only_path, output_path):
+    """Muxes a rendered video-only file with an ffmpeg-generated silent stereo track"""
+    cmd = [
+        "ffmpeg", "-y", "-i", video_only_path, "-f", "lavfi", "-i", "anullsrc=r=44100:cl=stereo",
+        "-map", "0:v:0", "-map", "1:a:0", "-c:v", "copy", "-c:a", "aac", "-b:a", "192k", "-shortest", output_path
+    ]
+    subprocess.run(cmd, check=True, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE)
+
+def filter_cut_segments(source_path, segments, output_path, codec, ffmpeg_params, video_filter=None):
+    """Frame-accurately cuts and joins segments in a single ffmpeg trim/concat filter graph"""
+    n = len(segments)
+    filters = [
+        f"[0:v]trim=start={start:.3f}:end={end:.3f},setpts=PTS-STARTPTS[v{i}];"
+        f"[0:a]atrim=start={start:.3f}:end={end:.3f},asetpts=PTS-STARTPTS[a{i}]"
+        for i, (start, end) in enumerate(segments)
+    ]
+    graph = ";".join(filters) + ";" + "".join(f"[v{i}][a{i}]" for i in range(n))
+    graph += f"concat=n={n}:v=1:a=1[outv][outa]"
+    if video_filter:
+        graph = graph.replace("[outv][outa]", f"[catv][outa];[catv]{video_filter}[outv]")
+    cmd = [
+        "ffmpeg", "-y", "-i", source_path, "-filter_complex", graph,
+        "-map", "[outv]", "-map", "[outa]", "-c:v", codec, *ffmpeg_params,
+        "-c:a", "aac", "-b:a", "192k", output_path
+    ]
+    subprocess.run(cmd, check=True, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE)
+
+# =========================
+# RENDER SETTINGS SECTION
+# =========================
+
+# Explicit encoder threading so the CPU encode uses every core
+CPU_COUNT = os.cpu_count() or 1
+X264_THREADS = f"threads={CPU_COUNT}:lookahead-threads={max(2, CPU_COUNT // 4)}"
+X265_THREADS = f"pools={CPU_COUNT}:frame-threads={min(16, max(1, CPU_COUNT // 2))}:wpp=1"
+
+# Constant-quality levels for the hardware encoders. These are not CRF-equivalent:
+# "good" sits a few steps above libx264's CRF 20, "better" matches libx265's CRF 23,
+# and "ultra" is a high-quality lossy encode since the hardware paths have no lossless mode
+HW_CQ = {"good": "25", "better": "23", "ultra": "19"}
+
+def _nvenc_cq(quality):
+    return ("-rc", "vbr", "-cq", HW_CQ[quality], "-b:v", "0")
+
+def _amf_cqp(quality):
+    return ("-rc", "cqp", "-qp_i", HW_CQ[quality], "-qp_p", HW_CQ[quality])
+
+def _qsv_icq(quality):
+    return ("-global_quality", HW_CQ[quality])
+
+# (quality, gpu_type) -> (codec, ffmpeg params); gpu_type None is the CPU encode
+RENDER_PARAMS = {
+    ("good", None): ("libx264", ("-crf", "20", "-preset", "veryfast", "-x264-params", X264_THREADS, "-pix_fmt", "yuv420p")),
+    ("better", None): ("libx265", ("-crf", "23", "-preset", "fast", "-x265-params", X265_THREADS, "-pix_fmt", "yuv420p10le")),
+    ("ultra", None): ("libx265", ("-x265-params", f"lossless=1:{X265_THREADS}", "-preset", "medium", "-pix_fmt", "yuv444p10le")),
+    ("good", "nvidia"): ("h264_nvenc", ("-preset", "p5", "-tune", "hq", *_nvenc_cq("good"), "-pix_fmt", "yuv420p")),
+    ("better", "nvidia"): ("hevc_nvenc", ("-preset", "p5", "-tune", "hq", *_nvenc_cq("better"), "-pix_fmt", "yuv420p")),
+    ("ultra", "nvidia"): ("hevc_nvenc", ("-preset", "p7", "-tune", "hq", *_nvenc_cq("ultra"), "-profile:v", "main10", "-pix_fmt", "p010le")),
+    ("good", "amd"): ("h264_amf", ("-quality", "quality", *_amf_cqp("good"), "-pix_fmt", "yuv420p")),
+    ("better", "amd"): ("hevc_amf", ("-quality", "quality", *_amf_cqp("better"), "-pix_fmt", "yuv420p")),
+    ("ultra", "amd"): ("hevc_amf", ("-quality", "quality", *_amf_cqp("ultra"), "-pix_fmt", "yuv420p")),
+    ("good", "intel"): ("h264_qsv", ("-preset", "slower", *_qsv_icq("good"), "-pix_fmt", "yuv420p")),
+    ("better", "intel"): ("hevc_qsv", ("-preset", "slower", *_qsv_icq("better"), "-pix_fmt", "yuv420p")),
+    ("ultra", "intel"): ("hevc_qsv", ("-preset", "slower", *_qsv_icq("ultra"), "-pix_fmt", "yuv420p")),
+}
+
+# Encoders whose params carry no -preset; MoviePy's default "medium" is not a valid AMF preset
+DEFAULT_PRESETS = {"h264_amf": "quality", "hevc_amf": "quality"}
+
+def split_preset(params, codec):
+    """Pulls the -preset value out of an ffmpeg param list, or picks a valid default for the codec"""
+    params = list(params)
+    if "-preset" in params:
+        i = params.index("-preset")
+        preset = params[i + 1]
+        del params[i:i + 2]
+        return preset, params
+    return DEFAULT_PRESETS.get(codec, "medium"), params
+
+RENDER_DESCRIPTIONS = {
+    "good": "Using H.264 (libx264) for good quality and maximum compatibility.",
+    "better": "Using H.265 (libx265) for better quality and smaller file size.",
+    "ultra": "Using H.265 (libx265) lossless mode for maximum quality (very large files).",
+}
+
+# RGB -> BT.709 limited-range YUV in the scaler, then tag the stream;
+# source and target are both BT.709 so no transfer-curve math is needed
+BT709_SCALE = "scale=out_color_matrix=bt709:out_range=tv"
+BT709_TAGS = (
+    "-colorspace", "bt709",
+    "-color_primaries", "bt709",
+    "-color_trc", "bt709",
+    "-color_range", "tv",
+)
+
 # =========================
 # MAIN SCRIPT BEGINS HERE
 # =========================
 
 # --- Video Path Input Section ---
 video_path = get_input("Enter the path to your video file: ", "video", config)
-video = VideoFileClip(video_path)
-print(f"Loaded video: {video_path}, duration: {video.duration} seconds")
 
 # --- Check if output file already exists ---
 base, ext = os.path.splitext(video_path)
@@ -647,6 +1145,10 @@ if add_captions == "y":
             break
         print("Please enter 'before' or 'after'.")
 
+# Open the decoder only once the up-front prompts are answered
+video = VideoFileClip(video_path)
+print(f"Loaded video: {video_path}, duration: {video.duration} seconds")
+
 if graphic_timing == "before":
     video = add_graphic_to_video(video, config)
 if caption_timing == "before":
@@ -681,14 +1183,7 @@ else:
         print(f"Marked for removal: {start:.2f}s to {end:.2f}s")
 
 # Sort and merge overlapping/adjacent segments
-remove_segments.sort()
-merged = []
-for seg in remove_segments:
-    if not merged or seg[0] > merged[-1][1]:
-        merged.append(list(seg))
-    else:
-        merged[-1][1] = max(merged[-1][1], seg[1])
-remove_segments = merged
+remove_segments = merge_segments(remove_segments)
 
 # --- AUDIO MUTING SECTION (Manual + EDL) ---
 all_mute_segments = []
@@ -715,27 +1210,21 @@ if video.audio is not None:
         all_mute_segments.append((start, end))
         print(f"Marked for muting: {start:.2f}s to {end:.2f}s")
 
-# Remove overlapping mute segments
+# Remove overlapping mute segments, and the parts that are cut away anyway
+all_mute_segments = subtract_segments(merge_segments(all_mute_segments), remove_segments)
 if all_mute_segments and video.audio is not None:
-    all_mute_segments.sort()
-    merged_segments = []
-    for seg in all_mute_segments:
-        if not merged_segments or seg[0] > merged_segments[-1][1]:
-            merged_segments.append(seg)
-        else:
-            merged_segments[-1] = (merged_segments[-1][0], max(merged_segments[-1][1], seg[1]))
-    video = video.with_audio(mute_audio_segments(video.audio, merged_segments))
-    print(f"Applied {len(merged_segments)} muted audio segment(s) total")
+    video = video.with_audio(mute_audio_segments(video.audio, all_mute_segments))
+    print(f"Applied {len(all_mute_segments)} muted audio segment(s) total")
 
 # --- Build list of segments to KEEP ---
-keep_segments = []
-last_end = 0.0
-for start, end in remove_segments:
-    if last_end < start:
-        keep_segments.append((last_end, start))
-    last_end = end
-if last_end < video.duration:
-    keep_segments.append((last_end, video.duration))
+# Keeps are the gaps between merged removals, plus the head and tail of the video
+merged = np.array(remove_segments, dtype=np.float64).reshape(-1, 2)
+keep_starts = np.concatenate(([0.0], merged[:, 1]))
+keep_ends = np.concatenate((merged[:, 0], [video.duration]))
+mask = keep_ends > keep_starts
+keep_starts, keep_ends = keep_starts[mask], keep_ends[mask]
+keep_segments = list(zip(keep_starts.tolist(), keep_ends.tolist()))
+total_kept_dur = float((keep_ends - keep_starts).sum())
 if not keep_segments:
     print("No video left after removals!")
     exit(1)
@@ -748,8 +1237,14 @@ print(f"Number of segments kept: {len(clips)}")
 if not clips:
     print("No valid segments to keep after removal!")
     exit(1)
-video = concatenate_videoclips(clips, method="compose")
-video = video.with_duration(sum(c.duration for c in clips))
+if len(clips) == 1:
+    # A single kept span needs no concatenation wrapper
+    video = clips[0]
+else:
+    video = concatenate_videoclips(clips, method="chain" if _same_size_fps(clips) else "compose")
+# Only override the duration if concatenation drifted from the kept total
+if abs(video.duration - total_kept_dur) > 1e-6:
+    video = video.with_duration(total_kept_dur)
 
 # --- Post Edit Captioning and/or Graphics Section
 if graphic_timing == "after":
@@ -762,6 +1257,7 @@ if caption_timing == "after":
 # =========================
 
 video_with_audio = video  # fallback
+clips_to_close = []
 
 if video.audio is not None:
     print("\nAudio Mix Options:")
@@ -769,20 +1265,20 @@ if video.audio is not None:
     print("2. Remove all audio (silent video)")
     print("3. Replace original audio with new soundtrack")
     print("4. Mix original audio and new soundtrack")
-    while True:
+    audio_mode = ARGS.audio_mode
+    while audio_mode not in {"1", "2", "3", "4"}:
         audio_mode = input("Choose audio mode (1/2/3/4): ").strip()
-        if audio_mode in {"1", "2", "3", "4"}:
-            break
-        print("Please enter 1, 2, 3, or 4.")
+        if audio_mode not in {"1", "2", "3", "4"}:
+            print("Please enter 1, 2, 3, or 4.")
 else:
     print("\nNo original audio detected in the video.")
     print("1. Silent video")
     print("2. Add new soundtrack")
-    while True:
+    audio_mode = ARGS.audio_mode
+    while audio_mode not in {"1", "2"}:
         audio_mode = input("Choose audio mode (1/2): ").strip()
-        if audio_mode in {"1", "2"}:
-            break
-        print("Please enter 1 or 2.")
+        if audio_mode not in {"1", "2"}:
+            print("Please enter 1 or 2.")
 
 if audio_mode == "1":
     video_with_audio = video  # Keep original audio only (do nothing)
@@ -793,7 +1289,7 @@ elif audio_mode == "2":
     print("Original audio removed. Video will be silent.")
 
 elif audio_mode in {"3", "4"} or (audio_mode == "2" and video.audio is None):
-    audio_path = get_input("Enter the path to your additional audio track: ", "audio", config)
+    audio_path = ARGS.new_audio or get_input("Enter the path to your additional audio track: ", "audio", config)
     converted_audio_path = convert_mp3_to_wav(audio_path)
     new_audio = AudioFileClip(converted_audio_path)
     print(f"Loaded audio: {converted_audio_path}, duration: {new_audio.duration} seconds")
@@ -818,7 +1314,21 @@ elif audio_mode in {"3", "4"} or (audio_mode == "2" and video.audio is None):
     new_audio = new_audio.with_volume_scaled(volume_percent / 100)
 
     fades = []
-    while True:
+    for fade_type, start_str, duration_str in ARGS.fades or []:
+        try:
+            fade_start = parse_timestamp_string(start_str, video.duration)
+            if duration_str.strip().lower() == "end":
+                fade_duration = video.duration - fade_start
+            else:
+                fade_duration = parse_timestamp_string(duration_str, video.duration)
+        except ValueError as e:
+            print(f"Skipping fade {fade_type}:{start_str}:{duration_str}: {e}")
+            continue
+        if fade_start < 0 or fade_duration <= 0 or fade_start + fade_duration > video.duration:
+            print(f"Skipping fade {fade_type}:{start_str}:{duration_str}, it lies outside the video")
+            continue
+        fades.append((fade_type, fade_start, fade_duration))
+    while ARGS.fades is None:
         add_fade = input("\nAdd a fade? (y/n): ").strip().lower()
         if add_fade != 'y':
             break
@@ -849,8 +1359,7 @@ elif audio_mode in {"3", "4"} or (audio_mode == "2" and video.audio is None):
     tolerance = 0.05
     pad_needed = (video.duration + tolerance) - new_audio.duration
     if pad_needed > 0:
-        fps = new_audio.fps
-        silence = AudioArrayClip(np.zeros((int(pad_needed * fps), 2)), fps=fps)
+        silence = AudioClip(_silent_frame, duration=pad_needed, fps=new_audio.fps)
         new_audio = concatenate_audioclips([new_audio, silence])
     elif new_audio.duration > video.duration + tolerance:
         new_audio = new_audio.subclipped(0, video.duration + tolerance)
@@ -865,32 +1374,50 @@ elif audio_mode in {"3", "4"} or (audio_mode == "2" and video.audio is None):
         video_with_audio = video.with_audio(mixed_audio)
         print("Original audio and new soundtrack mixed.")
 
-    new_audio.close()
-    if 'mixed_audio' in locals() and hasattr(mixed_audio, "close"):
-        mixed_audio.close()
-    if converted_audio_path != audio_path:
-        try:
-            Path(converted_audio_path).unlink(missing_ok=True)
-        except Exception as e:
-            print(f"Could not delete temp WAV: {e}")
+    # The render still reads from these, so they are closed once it finishes
+    clips_to_close.append(new_audio)
+    if audio_mode == "4":
+        clips_to_close.append(mixed_audio)
 
-if (audio_mode == "2" and video_with_audio.audio is None) or (audio_mode == "1" and video_with_audio.audio is None):
-    duration = video.duration
-    fps_audio = 44100
-    silence = AudioArrayClip(np.zeros((int(duration * fps_audio), 2)), fps=fps_audio)
-    video_with_audio = video.with_audio(silence)
+# Silent output: ffmpeg synthesizes the silent track while muxing after the render
+needs_silent_audio = audio_mode in {"1", "2"} and video_with_audio.audio is None
 
 # =========================
 # RENDER SECTION
 # =========================
 
-use_hw = get_valid_input(
-    "Use hardware acceleration for rendering? (y/n): ",
-    invalid_responses=set()
-).strip().lower() == "y"
+# --- Cut-only edits can be stream copied without decoding or re-encoding ---
+cut_only = (
+    graphic_timing is None and caption_timing is None
+    and not all_mute_segments and audio_mode == "1" and video.audio is not None
+)
+if cut_only:
+    stream_copy = get_valid_input(
+        "Only cuts were made. Copy streams without re-encoding? Cuts snap to keyframes (y/n): ",
+        invalid_responses=set()
+    ).strip().lower() == "y"
+    if stream_copy:
+        try:
+            copied = stream_copy_segments(video_path, keep_segments, output_path)
+        except (subprocess.CalledProcessError, OSError) as e:
+            print(f"Stream copy failed: {ffmpeg_error(e)}")
+            copied = False
+        if copied:
+            print(f"Saved final video to: {output_path}")
+            print("\nAll done! Your video is ready.")
+            exit(0)
+        print("Falling back to a frame-accurate render.")
+
+if ARGS.gpu:
+    use_hw = ARGS.gpu != "none"
+else:
+    use_hw = get_valid_input(
+        "Use hardware acceleration for rendering? (y/n): ",
+        invalid_responses=set()
+    ).strip().lower() == "y"
 
-gpu_type = None
-if use_hw:
+gpu_type = ARGS.gpu if use_hw and ARGS.gpu else None
+if use_hw and not gpu_type:
     saved_gpu = config.get("gpu_type", "").strip().lower()
     if saved_gpu:
         reuse = input(f"Use saved GPU type '{saved_gpu}'? (y/n): ").strip().lower()
@@ -908,96 +1435,107 @@ if use_hw:
                 break
             print("Invalid input. Please enter 'nvidia', 'amd', or 'intel'.")
 
-while True:
+quality = ARGS.quality
+while quality not in {"good", "better", "ultra"}:
     quality = get_valid_input(
         "Render quality? Enter 'good' (H.264), 'better' (H.265), or 'ultra' (H.265 lossless): ",
         invalid_responses={"y", "n"}
     ).strip().lower()
-    if quality in {"good", "better", "ultra"}:
-        break
-    print("Please enter 'good', 'better', or 'ultra'.")
-
-if quality == "ultra":
-    codec = "libx265"
-    ffmpeg_params = [
-        "-x265-params", "lossless=1",
-        "-preset", "medium",
-        "-pix_fmt", "yuv444p10le"
-    ]
-    print("Using H.265 (libx265) lossless mode for maximum quality (very large files).")
-elif quality == "better":
-    codec = "libx265"
-    ffmpeg_params = [
-        "-crf", "23",
-        "-preset", "fast",
-        "-pix_fmt", "yuv420p10le"
-    ]
-    print("Using H.265 (libx265) for better quality and smaller file size.")
+    if quality not in {"good", "better", "ultra"}:
+        print("Please enter 'good', 'better', or 'ultra'.")
+
+if (quality, gpu_type) not in RENDER_PARAMS:
+    print(f"Unknown GPU type '{gpu_type}', falling back to CPU encoding.")
+    gpu_type = None
+# MoviePy's bundled imageio ffmpeg has no NVENC/AMF/QSV encoders; hardware renders need the system one
+system_ffmpeg = shutil.which("ffmpeg")
+if gpu_type and system_ffmpeg is None:
+    print("Hardware encoding needs ffmpeg on PATH, falling back to CPU encoding.")
+    gpu_type = None
+codec, ffmpeg_params = RENDER_PARAMS[(quality, gpu_type)]
+ffmpeg_params = list(ffmpeg_params)
+video_filter = None
+if gpu_type:
+    # Feed MoviePy's frame pipe straight into the hardware encoder; no intermediate re-encode
+    ffmpeg_writer.FFMPEG_BINARY = system_ffmpeg
+    video_filter = BT709_SCALE
+    ffmpeg_params = [*BT709_TAGS, *ffmpeg_params]
+    print(f"Encoding with {codec} using hardware acceleration...")
 else:
-    codec = "libx264"
-    ffmpeg_params = [
-        "-crf", "18",
-        "-preset", "ultrafast",
-        "-pix_fmt", "yuv420p"
-    ]
-    print("Using H.264 (libx264) for good quality and maximum compatibility.")
+    print(RENDER_DESCRIPTIONS[quality])
+
+# --- Cut-only edits without stream copy: one ffmpeg filter graph, no Python frame loop ---
+if cut_only:
+    try:
+        filter_cut_segments(video_path, keep_segments, output_path, codec, ffmpeg_params, video_filter)
+    except (subprocess.CalledProcessError, OSError) as e:
+        print(f"Filter cut failed, falling back to a full render: {ffmpeg_error(e)}")
+    else:
+        print(f"Saved final video to: {output_path}")
+        print("\nAll done! Your video is ready.")
+        exit(0)
 
 base, ext = os.path.splitext(video_path)
 temp_path = f"{base}_EDIT_TEMP.mp4"
 
+# Persist any config changes before the long-running encode
+flush_config()
+
+if video_filter:
+    ffmpeg_params = ["-vf", video_filter, *ffmpeg_params]
+# MoviePy always emits its own -preset ahead of ffmpeg_params, so hand it ours explicitly
+preset, ffmpeg_params = split_preset(ffmpeg_params, codec)
+
 if 'video_with_audio' not in locals():
     video_with_audio = video
 
-video_with_audio.write_videofile(
-    temp_path,
-    codec=codec,
-    audio_codec='aac',
-    audio_bitrate="192k",
-    ffmpeg_params=ffmpeg_params,
-    temp_audiofile='temp-audio.m4a',
-    remove_temp=True,
-    threads=os.cpu_count()
+# Original audio with no cuts or mutes: encode video only and copy the source audio stream
+audio_untouched = (
+    audio_mode == "1" and video.audio is not None
+    and not remove_segments and not all_mute_segments
 )
-print(f"Saved intermediate video to: {temp_path}")
-
-if use_hw and gpu_type:
-    if gpu_type == "nvidia":
-        hw_codec = "hevc_nvenc" if quality in {"better", "ultra"} else "h264_nvenc"
-        hw_params = ["-preset", "p7", "-tune", "hq"]
-        if quality == "ultra":
-            hw_params.extend(["-profile:v", "main10", "-pix_fmt", "p010le"])
+post_mux = audio_untouched or needs_silent_audio
+try:
+    if post_mux:
+        video_with_audio.write_videofile(
+            temp_path,
+            codec=codec,
+            preset=preset,
+            audio=False,
+            ffmpeg_params=ffmpeg_params,
+            threads=CPU_COUNT
+        )
+        try:
+            if audio_untouched:
+                mux_original_audio(temp_path, video_path, output_path)
+            else:
+                mux_silent_audio(temp_path, output_path)
+        except (subprocess.CalledProcessError, OSError) as e:
+            print(f"Audio mux failed, rendering audio with MoviePy instead: {ffmpeg_error(e)}")
+            post_mux = False
         else:
-            hw_params.extend(["-pix_fmt", "yuv420p"])
-    elif gpu_type == "amd":
-        hw_codec = "hevc_amf" if quality in {"better", "ultra"} else "h264_amf"
-        hw_params = [
-            "-quality", "quality",
-            "-colorspace", "bt709",
-            "-color_primaries", "bt709",
-            "-color_trc", "bt709",
-            "-color_range", "tv",
-            "-pix_fmt", "yuv420p"
-        ]
-    elif gpu_type == "intel":
-        hw_codec = "hevc_qsv" if quality in {"better", "ultra"} else "h264_qsv"
-        hw_params = [
-            "-preset", "slower",
-            "-pix_fmt", "yuv420p"
-        ]
-    cmd = [
-        "ffmpeg", "-y", "-i", temp_path,
-        "-vf", "colorspace=all=bt709:iall=bt709:itrc=bt709:ispace=bt709:range=tv:irange=tv",
-        "-c:v", hw_codec, *hw_params,
-        "-c:a", "copy", output_path
-    ]
-    print(f"Re-encoding with {hw_codec} using hardware acceleration...")
-    subprocess.run(cmd, check=True)
-    print(f"Saved final video to: {output_path}")
-    if os.path.exists(temp_path):
-        os.unlink(temp_path)
-else:
-    os.replace(temp_path, output_path)
-    print(f"Saved final video to: {output_path}")
+            os.remove(temp_path)
+
+    if not post_mux:
+        if needs_silent_audio:
+            # Generated chunk by chunk during the write; no full-length silent array
+            video_with_audio = video.with_audio(AudioClip(_silent_frame, duration=video.duration, fps=44100))
+        video_with_audio.write_videofile(
+            temp_path,
+            codec=codec,
+            preset=preset,
+            audio_codec='aac',
+            audio_bitrate="192k",
+            ffmpeg_params=ffmpeg_params,
+            temp_audiofile='temp-audio.m4a',
+            remove_temp=True,
+            threads=CPU_COUNT
+        )
+        os.replace(temp_path, output_path)
+finally:
+    for clip in clips_to_close:
+        clip.close()
+print(f"Saved final video to: {output_path}")
 
 print("\nAll done! Your video is ready.")
 